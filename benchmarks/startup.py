@@ -0,0 +1,141 @@
+"""Startup benchmark: import time and time-to-first-window.
+
+Runs fresh interpreters so nothing is cached between samples:
+
+  * `python -X importtime -c "import Quickdash"` gives the cumulative import
+    time of Quickdash and the slowest modules it pulls in;
+  * a child process imports Quickdash, builds StockApp on an empty watchlist
+    and measures until the first `update()` has mapped the window.
+
+Results are printed as JSON. With --baseline the run is compared against an
+earlier result and exits non-zero when a median grew by more than
+--max-regression, so startup regressions fail CI:
+
+    python benchmarks/startup.py --output startup.json
+    python benchmarks/startup.py --baseline startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_WINDOW_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+sys.path.insert(0, {repo!r})
+import Quickdash
+t_import = time.perf_counter()
+import tkinter as tk
+try:
+    root = tk.Tk()
+except tk.TclError as e:
+    print(json.dumps({{"import_s": t_import - t0, "first_window_s": None, "error": str(e)}}))
+    sys.exit(0)
+app = Quickdash.StockApp(root, "stock_data.json")
+root.update()
+t_window = time.perf_counter()
+print(json.dumps({{"import_s": t_import - t0, "first_window_s": t_window - t0}}))
+root.destroy()
+"""
+
+def parse_importtime(stderr, top=10):
+    """Return (Quickdash cumulative seconds, slowest top-level imports) from -X importtime output"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # Header line
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, self_us, cumulative_us))
+    # Children are logged before their parent, so Quickdash's direct imports are
+    # the depth-1 entries between the previous top-level import and Quickdash itself
+    total, children, pending = None, [], []
+    for name, depth, self_us, cumulative_us in entries:
+        if depth == 0:
+            if name == "Quickdash":
+                total, children = cumulative_us, pending
+            pending = []
+        elif depth == 1:
+            pending.append((name, cumulative_us))
+    children.sort(key=lambda item: item[1], reverse=True)
+    return (total / 1e6 if total is not None else None), [
+        {"module": name, "cumulative_s": cum / 1e6} for name, cum in children[:top]]
+
+def measure_import(workdir):
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import Quickdash"],
+                          cwd=workdir, env=dict(os.environ, PYTHONPATH=REPO_DIR),
+                          capture_output=True, text=True, check=True)
+    return parse_importtime(proc.stderr)
+
+def measure_first_window(workdir):
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", FIRST_WINDOW_SCRIPT.format(repo=REPO_DIR)],
+                          cwd=workdir, capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["process_s"] = time.perf_counter() - start
+    return result
+
+def median(values):
+    values = [v for v in values if v is not None]
+    return statistics.median(values) if values else None
+
+def run(repeat):
+    with tempfile.TemporaryDirectory() as workdir:
+        imports, slowest, windows = [], [], []
+        for _ in range(repeat):
+            total, top = measure_import(workdir)
+            imports.append(total)
+            slowest = top
+            windows.append(measure_first_window(workdir))
+    return {
+        "python": sys.version.split()[0],
+        "repeat": repeat,
+        "import_s": median(imports),
+        "first_window_s": median(w.get("first_window_s") for w in windows),
+        "process_to_window_s": median(w["process_s"] for w in windows if w.get("first_window_s") is not None),
+        "slowest_imports": slowest,
+        "notes": sorted({w["error"] for w in windows if "error" in w}),
+    }
+
+def compare(result, baseline, max_regression):
+    """Return a list of metrics that regressed beyond the allowed fraction"""
+    regressions = []
+    for metric in ("import_s", "first_window_s"):
+        old, new = baseline.get(metric), result.get(metric)
+        if old and new and new > old * (1 + max_regression):
+            regressions.append(f"{metric}: {old:.3f}s -> {new:.3f}s")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="samples per metric (median is reported)")
+    parser.add_argument("--output", help="also write the JSON result to this file")
+    parser.add_argument("--baseline", help="JSON result of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown vs baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+    result = run(args.repeat)
+    text = json.dumps(result, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.max_regression)
+        if regressions:
+            print("Startup regressions: " + "; ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
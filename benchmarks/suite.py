@@ -0,0 +1,414 @@
+"""Benchmark suite for QuickDash, run against the local Yahoo stand-in.
+
+Starts benchmarks/yahoo_stub.py on a free port, points QuickDash at it and
+times the hot paths across portfolio sizes and history ranges:
+
+  * parse_chart             JSON decoding, parse_chart_result and PriceSeries
+  * change_computation      the 24h/7d/30d changes of one series
+  * fetch_stock_data        one symbol through HTTP, parsing and the price store
+  * fetch_all               a whole portfolio (spark batches plus gap fetches)
+  * update_tree / sort_tree the portfolio table with N rows
+  * add_graph_tab           showing a series in the chart, including the draw
+  * hover                   one hover event (nearest point lookup and blit)
+  * generate_arima_forecast fitting the default ARIMA model
+  * backtest_arima          a rolling-origin backtest of the default model
+  * export_report           every chart and the summary table as PNGs or a PDF
+
+The table, chart and hover benchmarks need a display; without one they are
+reported under "skipped". Results are printed as JSON, and --baseline compares
+the medians with an earlier run and exits non-zero on regressions:
+
+    python benchmarks/suite.py --output bench.json
+    python benchmarks/suite.py --baseline bench.json --sizes 10,100
+    python benchmarks/suite.py --latency 0.05 --error-rate 0.02 --only fetch
+    python benchmarks/suite.py --rate-limit 20 --only fetch --sizes 100,1000
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCH_DIR)
+sys.path[:0] = [REPO_DIR, BENCH_DIR]
+
+import numpy as np
+import yahoo_stub
+
+DEFAULT_SIZES = "10,100,1000,10000"
+DEFAULT_RANGES = "1wk,1mo,3mo,1y,5y,max"
+BENCH_SYMBOL = "BENCH"  # Synthetic symbol with the full stub history
+
+def summarize(samples):
+    return {
+        "n": len(samples),
+        "min_s": min(samples),
+        "median_s": statistics.median(samples),
+        "mean_s": statistics.fmean(samples),
+        "max_s": max(samples),
+    }
+
+def measure(fn, repeat, setup=None, warmup=0):
+    """Time fn() repeat times, calling setup() untimed before each run.
+
+    warmup untimed runs go first, e.g. to keep one-off imports out of the samples.
+    """
+    for _ in range(warmup):
+        if setup is not None:
+            setup()
+        fn()
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def repeats_for(size, repeat):
+    """Fewer repeats for big portfolios so the suite finishes in minutes"""
+    return max(1, min(repeat, 1000 // max(size, 1)))
+
+class Suite:
+    def __init__(self, Q, market, workdir, args):
+        self.Q = Q
+        self.market = market
+        self.workdir = workdir
+        self.args = args
+        self.results = []
+        self.skipped = []
+
+    def record(self, name, params, stats, **extra):
+        self.results.append(dict(name=name, params=params, **stats, **extra))
+        print(f"{name} {params}: median {stats['median_s'] * 1000:.3f} ms", file=sys.stderr)
+
+    def chart_payload(self, range_name, symbol=BENCH_SYMBOL):
+        """Response body the stub would send for a chart request"""
+        result = self.market.chart_result(symbol, {"range": range_name})
+        return json.dumps({"chart": {"result": [result], "error": None}})
+
+    def series(self, range_name, symbol=BENCH_SYMBOL):
+        bars, _ = self.Q.parse_chart_result(json.loads(self.chart_payload(range_name, symbol))["chart"]["result"][0])
+        return self.Q.PriceSeries.from_bars(bars)
+
+    def stock_data(self, symbols, range_name="1mo"):
+        """Computed per-symbol data, as fetch_stock_data would return it"""
+        data = {}
+        for symbol in symbols:
+            series = self.series(range_name, symbol)
+            data[symbol] = {"price_data": series, "30d_change": series.change_since(30),
+                            "7d_change": series.change_since(7), "24h_change": series.change_since(1),
+                            "company_name": f"{symbol} Synthetic Corp."}
+        return data
+
+    def new_core(self):
+        path = tempfile.mkdtemp(dir=self.workdir)
+        core = self.Q.PortfolioCore(os.path.join(path, "stock_data.json"), os.path.join(path, "price_history.db"))
+        if self.args.max_concurrency:
+            core.set_max_concurrency(self.args.max_concurrency)
+        return core
+
+    def bench_parse(self):
+        for range_name in self.args.ranges:
+            payload = self.chart_payload(range_name)
+
+            def parse():
+                result = json.loads(payload)["chart"]["result"][0]
+                bars, company_name = self.Q.parse_chart_result(result)
+                self.Q.PriceSeries.from_bars(bars)
+
+            stats = measure(parse, self.args.repeat * 10)
+            self.record("parse_chart", {"range": range_name}, stats, bars=len(self.series(range_name)))
+
+    def bench_changes(self):
+        for range_name in self.args.ranges:
+            series = self.series(range_name)
+
+            def changes():
+                series.change_since(30)
+                series.change_since(7)
+                series.change_since(1)
+
+            self.record("change_computation", {"range": range_name}, measure(changes, self.args.repeat * 100))
+
+    def bench_analytics(self):
+        series = self.series("1y")
+        for size in self.args.sizes:
+            engine = self.Q.PortfolioAnalytics()
+            for i in range(size):
+                # Rotated copies of one history keep the columns distinct without refetching
+                engine.set_series(f"A{i:05d}", series.epochs, np.roll(series.closes, i))
+                engine.set_holding(f"A{i:05d}", 10, 100)
+            repeat = repeats_for(size, self.args.repeat)
+
+            def full():
+                engine.full = True
+                engine.update()
+
+            self.record("analytics_update", {"holdings": size, "scope": "all"}, measure(full, repeat))
+            changed = f"A{size // 2:05d}"
+            stats = measure(engine.update, self.args.repeat * 10,
+                            setup=lambda: engine.set_series(changed, series.epochs, series.closes))
+            self.record("analytics_update", {"holdings": size, "scope": "one"}, stats)
+
+    def bench_alerts(self):
+        # 50 rules over every kind of feature and operator
+        specs = ([{"name": f"drop{i}", "condition": f"change_24h < {-i / 5}"} for i in range(20)]
+                 + [{"name": f"cross{i}", "condition": f"price crosses_above sma_{5 * i + 5}"} for i in range(10)]
+                 + [{"name": f"trend{i}", "condition": f"change_7d > {i} and change_30d < {2 * i}"} for i in range(10)]
+                 + [{"name": f"band{i}", "condition": "price > band_upper or price < band_lower"} for i in range(10)])
+        rules, errors = self.Q.compile_alert_rules(specs)
+        data = self.stock_data(["ALERT"], "1y")["ALERT"]
+        for size in self.args.sizes:
+            engine = self.Q.AlertEngine(rules)
+            inputs = {f"L{i:05d}": (data, {}) for i in range(size)}
+            repeat = repeats_for(size, self.args.repeat)
+            self.record("alerts_update", {"symbols": size, "rules": len(rules), "scope": "all"},
+                        measure(lambda: engine.update(inputs), repeat))
+            rows = np.arange(size)
+            self.record("alerts_evaluate", {"symbols": size, "rules": len(rules)},
+                        measure(lambda: engine.evaluate(rows), self.args.repeat * 10))
+            # One spark batch worth of refreshed symbols
+            batch = dict(list(inputs.items())[:self.Q.SPARK_BATCH_SIZE])
+            self.record("alerts_update", {"symbols": size, "rules": len(rules), "scope": "batch"},
+                        measure(lambda: engine.update(batch), self.args.repeat * 10))
+
+    def bench_fetch(self):
+        holder = {}
+
+        def fresh_core():
+            if "core" in holder:
+                holder["core"].shutdown()
+            holder["core"] = self.new_core()
+
+        for period in self.args.ranges:
+            if period not in self.Q.PERIOD_DAYS:
+                continue  # Not a period the app fetches
+            fresh_core()
+            stats = measure(lambda: holder["core"].fetch_stock_data(BENCH_SYMBOL, period), self.args.repeat,
+                            setup=fresh_core)
+            self.record("fetch_stock_data", {"period": period, "state": "cold"}, stats)
+            stats = measure(lambda: holder["core"].fetch_stock_data(BENCH_SYMBOL, period), self.args.repeat)
+            self.record("fetch_stock_data", {"period": period, "state": "warm"}, stats)
+
+        for size in self.args.sizes:
+            symbols = [f"B{i:05d}" for i in range(size)]
+            repeat = repeats_for(size, self.args.repeat)
+            outcome = {}
+
+            def fetch():
+                outcome["results"], outcome["failures"] = holder["core"].fetch_all(symbols, "1mo")
+
+            # Cold: empty price store, so every symbol needs a chart request for its name
+            stats = measure(fetch, repeat, setup=fresh_core)
+            self.record("fetch_all", {"symbols": size, "state": "cold"}, stats, failures=len(outcome["failures"]))
+            # Warm: spark batches only fetch the bars since the last run
+            stats = measure(fetch, repeat)
+            self.record("fetch_all", {"symbols": size, "state": "warm"}, stats, failures=len(outcome["failures"]))
+        if "core" in holder:
+            holder["core"].shutdown()
+
+    def bench_arima(self):
+        core = self.new_core()
+        for range_name in self.args.ranges:
+            series = self.series(range_name)
+            if len(series) < 10:
+                continue  # The app needs at least 10 points to forecast
+            stats = measure(lambda: core.generate_arima_forecast(series), max(1, self.args.repeat // 2), warmup=1)
+            self.record("generate_arima_forecast", {"range": range_name}, stats, points=len(series))
+            if len(series) >= 2 * 30 + max(self.Q.BACKTEST_HORIZONS):
+                stats = measure(lambda: self.Q.backtest_arima(series.closes), max(1, self.args.repeat // 2), warmup=1)
+                self.record("backtest_arima", {"range": range_name}, stats, points=len(series))
+        core.shutdown()
+
+    def bench_export(self):
+        core = self.new_core()
+        try:
+            for size in self.args.sizes:
+                if size > 1000:
+                    continue  # A chart per symbol; larger portfolios only scale linearly
+                core.stocks = [f"E{i:05d}" for i in range(size)]
+                core.fetch_all(core.stocks, "1y")  # Price store warm, as after a refresh
+                for kind in ("png", "pdf"):
+                    path = os.path.join(tempfile.mkdtemp(dir=self.workdir), "report" + (".pdf" if kind == "pdf" else ""))
+                    stats = measure(lambda: core.export_report(path, period="1y"), 1)
+                    self.record("export_report", {"symbols": size, "format": kind}, stats)
+        finally:
+            core.shutdown()
+
+    def make_app(self):
+        """StockApp on an empty watchlist, or None when there is no display"""
+        tk = self.Q.tk
+        try:
+            root = tk.Tk()
+        except tk.TclError as e:
+            return None, str(e)
+        app = self.Q.StockApp(root, os.path.join(tempfile.mkdtemp(dir=self.workdir), "stock_data.json"))
+        root.update()
+        return app, None
+
+    def bench_gui(self):
+        app, error = self.make_app()
+        if app is None:
+            self.skipped.append({"benchmarks": ["update_tree", "sort_tree", "add_graph_tab", "hover", "comparison"],
+                                 "reason": f"no display: {error}"})
+            return
+        try:
+            for size in self.args.sizes:
+                symbols = [f"T{i:05d}" for i in range(size)]
+                app.stocks = list(symbols)
+                app.stock_data = self.stock_data(symbols)
+                repeat = repeats_for(size, self.args.repeat) * 5
+                # Rebuild every row from an empty table model
+                stats = measure(lambda: app.update_tree(), repeat, setup=lambda: app.table.set_symbols([]))
+                self.record("update_tree", {"rows": size, "scope": "all"}, stats)
+                # One row changes, as when a single fetch finishes
+                changed = symbols[len(symbols) // 2]
+                toggle = lambda: app.loading.symmetric_difference_update([changed])
+                stats = measure(lambda: app.update_tree([changed]), self.args.repeat * 10, setup=toggle)
+                self.record("update_tree", {"rows": size, "scope": "one"}, stats)
+                app.loading.clear()
+                columns = ["24h", "symbol", "30d", "company"]
+                stats = measure(lambda: app.sort_tree(columns[random.randrange(len(columns))]), repeat)
+                self.record("sort_tree", {"rows": size}, stats)
+            app.root.update()
+
+            for range_name in self.args.ranges:
+                data = self.stock_data([BENCH_SYMBOL], range_name)[BENCH_SYMBOL]
+
+                def render():
+                    app.add_graph_tab(BENCH_SYMBOL, data)
+                    app.chart.canvas.draw()
+
+                stats = measure(render, self.args.repeat, warmup=1)
+                self.record("add_graph_tab", {"range": range_name}, stats, points=len(data["price_data"]))
+
+                chart = app.chart
+                xs = [random.uniform(chart.xnum[0], chart.xnum[-1]) for _ in range(self.args.repeat * 20)]
+                positions = iter(xs)
+
+                def hover():
+                    chart.hover_x = next(positions)
+                    chart.hover_index = None  # Force a redraw even if the point did not change
+                    chart.update_hover()
+
+                self.record("hover", {"range": range_name}, measure(hover, len(xs)), points=len(data["price_data"]))
+
+                # Ten symbols overlaid in the comparison tab
+                app.stock_data = self.stock_data([f"C{i:02d}" for i in range(10)], range_name)
+                app.compare_symbols = list(app.stock_data)
+
+                def compare():
+                    app.show_comparison()
+                    app.compare_chart.canvas.draw()
+
+                self.record("comparison", {"range": range_name, "symbols": 10}, measure(compare, self.args.repeat, warmup=1))
+        finally:
+            app.stocks = []
+            app.on_closing()
+
+    def run(self):
+        benches = {
+            "parse": self.bench_parse,
+            "changes": self.bench_changes,
+            "analytics": self.bench_analytics,
+            "alerts": self.bench_alerts,
+            "fetch": self.bench_fetch,
+            "gui": self.bench_gui,
+            "arima": self.bench_arima,
+            "export": self.bench_export,
+        }
+        for name, bench in benches.items():
+            if self.args.only and name not in self.args.only:
+                continue
+            bench()
+
+def result_key(result):
+    return result["name"] + json.dumps(result["params"], sort_keys=True)
+
+def compare(results, baseline, max_regression, min_delta):
+    """List the benchmarks whose median grew by more than max_regression (and min_delta seconds)"""
+    old = {result_key(r): r["median_s"] for r in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = old.get(result_key(result))
+        after = result["median_s"]
+        if before and after > before * (1 + max_regression) and after - before > min_delta:
+            regressions.append(f"{result['name']} {result['params']}: {before * 1000:.3f} -> {after * 1000:.3f} ms")
+    return regressions
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help=f"portfolio sizes (default: {DEFAULT_SIZES})")
+    parser.add_argument("--ranges", default=DEFAULT_RANGES, help=f"history ranges (default: {DEFAULT_RANGES})")
+    parser.add_argument("--repeat", type=int, default=5, help="base number of samples per benchmark")
+    parser.add_argument("--only", help="comma separated groups to run: parse,changes,analytics,alerts,fetch,gui,arima,export")
+    parser.add_argument("--latency", type=float, default=0.0, help="stub response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random stub latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of stub requests that fail")
+    parser.add_argument("--rate-limit", type=float, help="stub requests per second before it answers 429")
+    parser.add_argument("--max-concurrency", type=int, help="parallel HTTP requests (default: the app's)")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed slowdown (0.2 = 20%%)")
+    parser.add_argument("--min-delta", type=float, default=0.0005, help="ignore slowdowns below this many seconds")
+    args = parser.parse_args(argv)
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+    args.ranges = [r for r in args.ranges.split(",") if r]
+    args.only = args.only.split(",") if args.only else None
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    random.seed(0)
+    market = yahoo_stub.StubMarket()
+    server, url = yahoo_stub.make_server(market=market, latency=args.latency, jitter=args.jitter,
+                                         error_rate=args.error_rate, rate_limit=args.rate_limit)
+    # Quickdash reads the base URL at import time
+    os.environ["QUICKDASH_YAHOO_URL"] = url
+    import Quickdash
+    try:
+        # The app's own messages go to stderr so stdout is only the JSON results
+        with tempfile.TemporaryDirectory() as workdir, contextlib.redirect_stdout(sys.stderr):
+            suite = Suite(Quickdash, market, workdir, args)
+            suite.run()
+    finally:
+        server.shutdown()
+    output = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "sizes": args.sizes,
+            "ranges": args.ranges,
+            "repeat": args.repeat,
+            "latency": args.latency,
+            "jitter": args.jitter,
+            "error_rate": args.error_rate,
+            "rate_limit": args.rate_limit,
+            "throttled": server.rate_limit.throttled if server.rate_limit else 0,
+        },
+        "results": suite.results,
+        "skipped": suite.skipped,
+    }
+    text = json.dumps(output, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(suite.results, json.load(f), args.max_regression, args.min_delta)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Local stand-in for the Yahoo Finance chart and spark endpoints.
+
+Chart responses saved in fixtures/ are replayed (shifted by whole weeks so
+their last bar lands on the latest weekday), and any other symbol gets a
+deterministic synthetic random walk, so QuickDash can be exercised offline:
+
+    python benchmarks/yahoo_stub.py --port 8765
+    QUICKDASH_YAHOO_URL=http://127.0.0.1:8765 python Quickdash.py
+
+Symbols starting with INVALID are answered with a 404 like unknown tickers.
+--latency and --jitter delay every response, and --error-rate answers that
+fraction of requests with a 500, to exercise slow and flaky networks.
+--rate-limit answers requests beyond that many per second with a 429 and a
+Retry-After header, like Yahoo does when it throttles a client.
+Use --record SYMBOL ... to capture fresh fixtures from the real API.
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RANGE_DAYS = {"1d": 1, "5d": 5, "1wk": 7, "1mo": 31, "3mo": 92, "6mo": 183, "1y": 366,
+              "2y": 731, "5y": 1827, "10y": 3653, "max": 7300}
+INTRADAY_SECONDS = {"1m": 60, "2m": 120, "5m": 300, "15m": 900, "30m": 1800, "60m": 3600, "1h": 3600}
+SPARK_MAX_SYMBOLS = 20
+DAY = 86400
+WEEK = 7 * DAY
+
+def last_weekday_close(now):
+    """Timestamp of the most recent weekday bar (14:30 UTC, the US open) at or before now"""
+    ts = now - now % DAY + 14 * 3600 + 1800
+    if ts > now:
+        ts -= DAY
+    while time.gmtime(ts).tm_wday >= 5:
+        ts -= DAY
+    return ts
+
+class SyntheticCloses:
+    """Closes of a synthetic symbol, computed only for the bars that are sliced out"""
+    def __init__(self, walk, offset, length, scale):
+        self.walk, self.offset, self.length, self.scale = walk, offset, length, scale
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [round(self.walk[self.offset + i] * self.scale, 4) for i in range(*index.indices(self.length))]
+        return round(self.walk[self.offset + range(self.length)[index]] * self.scale, 4)
+
+class RateLimit:
+    """Server-side token bucket: at most rate requests per second, bursts of one second"""
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.tokens = self.rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        self.throttled = 0  # Requests answered with a 429
+
+    def allow(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            self.throttled += 1
+            return False
+
+class StubMarket:
+    """Daily bars per symbol: recorded fixtures first, synthetic otherwise"""
+    def __init__(self, fixture_dir=FIXTURE_DIR, now=None):
+        self.now = int(now or time.time())
+        self.last_bar = last_weekday_close(self.now)
+        self.fixtures = {}
+        if os.path.isdir(fixture_dir):
+            for name in os.listdir(fixture_dir):
+                if name.startswith("chart_") and name.endswith(".json"):
+                    with open(os.path.join(fixture_dir, name)) as f:
+                        self.fixtures[name[len("chart_"):-len(".json")]] = json.load(f)
+        self.cache = {}
+        self.lock = threading.Lock()
+        # Synthetic symbols share one weekday calendar and one random walk twice
+        # its length; each symbol is a scaled window of the walk, so thousands of
+        # them cost nothing until their bars are requested
+        self.calendar = [ts for ts in range(self.last_bar - RANGE_DAYS["max"] * DAY, self.last_bar + 1, DAY)
+                         if (ts // DAY + 3) % 7 < 5]
+        rng = random.Random(0)
+        price, self.walk = 1.0, []
+        for _ in range(2 * len(self.calendar)):
+            price *= 1 + rng.gauss(0.0003, 0.018)
+            self.walk.append(price)
+
+    def bars(self, symbol):
+        """Return (timestamps, closes, meta) for the symbol's full history"""
+        with self.lock:
+            if symbol not in self.cache:
+                self.cache[symbol] = self._load(symbol)
+            return self.cache[symbol]
+
+    def _load(self, symbol):
+        recorded = self.fixtures.get(symbol)
+        if recorded is not None:
+            result = recorded["chart"]["result"][0]
+            timestamps = result["timestamp"]
+            # Replay relative to today, keeping weekdays intact
+            shift = (self.last_bar - timestamps[-1]) // WEEK * WEEK
+            return ([ts + shift for ts in timestamps], result["indicators"]["quote"][0]["close"],
+                    dict(result.get("meta", {})))
+        rng = random.Random(zlib.crc32(symbol.encode()))
+        price = rng.uniform(20, 500)
+        offset = rng.randrange(len(self.calendar))
+        closes = SyntheticCloses(self.walk, offset, len(self.calendar), price / self.walk[offset])
+        timestamps = self.calendar
+        meta = {"currency": "USD", "symbol": symbol, "shortName": f"{symbol} Synthetic Corp.",
+                "exchangeName": "NMS", "instrumentType": "EQUITY", "dataGranularity": "1d"}
+        return timestamps, closes, meta
+
+    def intraday_bars(self, symbol, step, start, end):
+        """Synthetic intraday bars every step seconds in [start, end], anchored at the last daily close.
+
+        The stub market trades around the clock so live mode always has data.
+        Prices are a deterministic function of the bar time, except that the
+        newest bar moves every few seconds, like a bar that is still forming.
+        """
+        timestamps, closes, meta = self.bars(symbol)
+        anchor = closes[-1]
+        phase = zlib.crc32(symbol.encode()) % 1000
+        now = int(time.time())
+        latest = now - now % step
+        bars_ts, bars_close = [], []
+        for ts in range(start - start % step + (step if start % step else 0), min(end, latest) + 1, step):
+            salt = f"{symbol}:{ts}" + (f":{now // 5}" if ts == latest else "")
+            noise = zlib.crc32(salt.encode()) / 2 ** 32 - 0.5
+            bars_ts.append(ts)
+            bars_close.append(round(anchor * (1 + 0.004 * math.sin(ts / 5400 + phase) + 0.002 * noise), 4))
+        return bars_ts, bars_close
+
+    def chart_result(self, symbol, query):
+        """Chart API result for symbol restricted to the range/period1/period2 in query"""
+        step = INTRADAY_SECONDS.get(query.get("interval", "1d"))
+        if step is not None:
+            if "period1" in query:
+                start, end = int(query["period1"]), int(query.get("period2", time.time()))
+            else:
+                end = int(time.time())
+                start = end - RANGE_DAYS.get(query.get("range", "1d"), 1) * DAY
+            bars_ts, bars_close = self.intraday_bars(symbol, step, start, end)
+            meta = dict(self.bars(symbol)[2], symbol=symbol, dataGranularity=query["interval"],
+                        range=query.get("range", ""))
+            return {"meta": meta, "timestamp": bars_ts, "indicators": {"quote": [{"close": bars_close}]}}
+        timestamps, closes, meta = self.bars(symbol)
+        if "period1" in query:
+            start = int(query["period1"])
+            end = int(query.get("period2", self.now))
+        else:
+            start = self.now - RANGE_DAYS.get(query.get("range", "1mo"), 31) * DAY
+            end = self.now
+        first, last = bisect.bisect_left(timestamps, start), bisect.bisect_right(timestamps, end)
+        meta = dict(meta, symbol=symbol, regularMarketPrice=closes[-1], range=query.get("range", ""))
+        return {
+            "meta": meta,
+            "timestamp": timestamps[first:last],
+            "indicators": {"quote": [{"close": closes[first:last]}]},
+        }
+
+class StubHandler(BaseHTTPRequestHandler):
+    market = None  # Set by make_server
+    latency = 0.0  # Seconds added to every response
+    jitter = 0.0  # Extra uniformly distributed delay, in seconds
+    error_rate = 0.0  # Fraction of requests answered with a 500
+    rate_limit = None  # RateLimit, or None for no throttling
+    retry_after = 1  # Seconds sent in the Retry-After header of 429s
+    rng = random.Random(0)
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real endpoint
+    # Headers and body go out in separate writes; without this, Nagle's algorithm
+    # and delayed ACKs add ~40ms to every response on a reused connection
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0.0)
+        if delay:
+            time.sleep(delay)
+        if self.rate_limit is not None and not self.rate_limit.allow():
+            self.send_json(429, {"finance": {"result": None, "error": {
+                "code": "Too Many Requests", "description": "Rate limited by yahoo_stub"}}},
+                headers={"Retry-After": str(self.retry_after)})
+            return
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.send_json(500, {"finance": {"result": None, "error": {
+                "code": "Internal Server Error", "description": "Injected by yahoo_stub"}}})
+            return
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if url.path.startswith("/v8/finance/chart/"):
+            symbol = unquote(url.path.rsplit("/", 1)[-1])
+            if symbol.startswith("INVALID"):
+                self.send_json(404, {"chart": {"result": None, "error": {
+                    "code": "Not Found", "description": "No data found, symbol may be delisted"}}})
+                return
+            self.send_json(200, {"chart": {"result": [self.market.chart_result(symbol, query)], "error": None}})
+        elif url.path == "/v7/finance/spark":
+            symbols = [s for s in query.get("symbols", "").split(",") if s]
+            if len(symbols) > SPARK_MAX_SYMBOLS:
+                self.send_json(400, {"spark": {"result": None, "error": {
+                    "code": "Bad Request", "description": f"at most {SPARK_MAX_SYMBOLS} symbols"}}})
+                return
+            result = [{"symbol": s, "response": [self.market.chart_result(s, query)]}
+                      for s in symbols if not s.startswith("INVALID")]
+            self.send_json(200, {"spark": {"result": result, "error": None}})
+        else:
+            self.send_json(404, {"finance": {"result": None, "error": {"code": "Not Found"}}})
+
+    def send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_server(port=0, market=None, latency=0.0, jitter=0.0, error_rate=0.0, seed=0,
+                rate_limit=None, retry_after=1):
+    """Start the stub on a background thread; returns (server, base_url).
+
+    With rate_limit the RateLimit is available as server.rate_limit.
+    """
+    handler = type("BoundStubHandler", (StubHandler,), {
+        "market": market or StubMarket(), "latency": latency, "jitter": jitter,
+        "error_rate": error_rate, "rng": random.Random(seed),
+        "rate_limit": RateLimit(rate_limit) if rate_limit else None, "retry_after": retry_after})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    server.rate_limit = handler.rate_limit
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def record(symbols, range_name="1y", fixture_dir=FIXTURE_DIR):
+    """Save real chart responses for symbols as fixtures"""
+    import requests
+    os.makedirs(fixture_dir, exist_ok=True)
+    headers = {"User-Agent": "Mozilla/5.0"}
+    for symbol in symbols:
+        resp = requests.get(f"https://query1.finance.yahoo.com/v8/finance/chart/{symbol}",
+                            params={"interval": "1d", "range": range_name}, headers=headers, timeout=10)
+        resp.raise_for_status()
+        with open(os.path.join(fixture_dir, f"chart_{symbol}.json"), "w") as f:
+            json.dump(resp.json(), f)
+        print(f"Recorded {symbol}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--record", nargs="+", metavar="SYMBOL", help="record fixtures from the real API and exit")
+    parser.add_argument("--range", default="1y", help="range to record (default: 1y)")
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random delay of up to this many seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument("--rate-limit", type=float, help="requests per second allowed before answering 429")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    args = parser.parse_args()
+    if args.record:
+        record(args.record, args.range)
+        return
+    server, url = make_server(args.port, latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                              rate_limit=args.rate_limit, retry_after=args.retry_after)
+    print(f"Serving Yahoo chart/spark stand-in on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()